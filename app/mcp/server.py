@@ -20,7 +20,7 @@ from app.logger import logger
 from app.tool.base import BaseTool
 from app.tool.bash import Bash
 from app.tool.browser_use_tool import BrowserUseTool
-from app.tool.manus_agent_tool import ManusAgentTool
+from app.tool.manus_agent_tool import ManusAgentTool, agent_pool
 from app.tool.str_replace_editor import StrReplaceEditor
 from app.tool.terminate import Terminate
 
@@ -54,7 +54,9 @@ class MCPServer:
             logger.info(f"Executing {tool_name}: {kwargs}")
 
             # Special handling for Manus agent with streaming support
-            # Check server-wide streaming setting - only this determines if streaming is used
+            # Only the server-wide setting enables streaming. FastMCP sends a tool
+            # result as a single response, so neither the SSE transport nor a
+            # client-side flag can turn on incremental events
             import os
 
             server_allows_streaming = (
@@ -65,7 +67,12 @@ class MCPServer:
             if "streaming" in kwargs:
                 del kwargs["streaming"]
 
-            if tool_name == "manus_agent" and server_allows_streaming:
+            # Batched prompts always return a single collected result
+            if (
+                tool_name == "manus_agent"
+                and server_allows_streaming
+                and not kwargs.get("prompts")
+            ):
                 logger.info(
                     f"Using streaming mode for {tool_name} (controlled by server setting)"
                 )
@@ -111,12 +118,9 @@ class MCPServer:
                             # This is the key part that ensures the generator is actually running
                             logger.info("Starting to consume Manus agent generator")
                             try:
+                                # Chunks are not logged individually: the log file
+                                # records DEBUG too, so every chunk would be written
                                 async for chunk in generator:
-                                    logger.info(
-                                        f"Streaming chunk: {chunk[:50]}..."
-                                        if len(chunk) > 50
-                                        else f"Streaming chunk: {chunk}"
-                                    )
                                     yield chunk
                             except Exception as inner_e:
                                 logger.error(
@@ -166,11 +170,6 @@ class MCPServer:
                         # Collect all results
                         logger.info("Collecting all results from generator")
                         async for chunk in generator:
-                            logger.info(
-                                f"Collected chunk: {chunk[:50]}..."
-                                if len(chunk) > 50
-                                else f"Collected chunk: {chunk}"
-                            )
                             results.append(chunk)
 
                         # Return all collected results as JSON array
@@ -284,6 +283,19 @@ class MCPServer:
         # Follow original cleanup logic - only clean browser tool
         if "browser" in self.tools and hasattr(self.tools["browser"], "cleanup"):
             await self.tools["browser"].cleanup()
+        # Close the browsers and MCP connections of pooled Manus agents
+        await agent_pool.close()
+
+    @staticmethod
+    def _install_uvloop() -> None:
+        """Switch asyncio to uvloop if it is installed (not available on Windows)."""
+        try:
+            import uvloop
+        except ImportError:
+            logger.info("uvloop not available, using the default asyncio event loop")
+            return
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
 
     def register_all_tools(self) -> None:
         """Register all tools with the server."""
@@ -307,6 +319,9 @@ class MCPServer:
             port: Port to bind the HTTP/SSE server to (only used with sse transport)
             streaming: Whether streaming responses are enabled by default
         """
+        # Use the faster uvloop event loop where available
+        self._install_uvloop()
+
         # Register all tools
         self.register_all_tools()
 
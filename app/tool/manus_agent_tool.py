@@ -1,16 +1,381 @@
 """ManusAgentTool for exposing the Manus agent as an MCP tool."""
 
 import asyncio
+import hashlib
 import json
 import os
-from typing import AsyncGenerator, Optional, Union
+import re
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Union,
+)
+
+from pydantic import PrivateAttr
 
 from app.agent.manus import Manus
 from app.logger import logger
-from app.schema import AgentState, Message
+from app.schema import AgentState, Message, Role, ToolCall
 from app.tool.base import BaseTool, ToolResult
 
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        """Serialize an event or result to a JSON string using orjson."""
+        return orjson.dumps(obj).decode()
+
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+
+    def _dumps(obj: Any) -> str:
+        """Serialize an event or result to a JSON string."""
+        return json.dumps(obj)
+
+
+async def _discard_event(event: str) -> None:
+    """Progress event sink for runs whose caller only wants the final result."""
+
+
+def _step_event(status: str, step: int) -> str:
+    """Serialize a fixed-schema progress event without a generic JSON encoder.
+
+    `status` must be one of the literal event names, which need no escaping.
+    """
+    return f'{{"status":"{status}","step":{step}}}'
+
+
+def _step_error_event(step: int, error: str) -> str:
+    """Serialize a step error event; only the error text goes through the encoder."""
+    return f'{{"status":"error","step":{step},"error":{_dumps(error)}}}'
+
+
+class AgentPool:
+    """Pool of reusable Manus agents.
+
+    Constructing a Manus agent sets up its LLM client, tool collection and
+    browser helper, so agents are created once and checked out per request
+    instead of being rebuilt on every call. Agents are reset before they are
+    returned to the pool. The first checkout warms up the rest of the pool in
+    the background.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._idle: asyncio.Queue[Manus] = asyncio.Queue(maxsize=max_workers)
+        self._agents: List[Manus] = []
+        self._created = 0
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    async def _create_agent(self) -> Manus:
+        """Create a new agent and register it with the pool.
+
+        Construction runs in a worker thread so the event loop keeps serving
+        other requests during the (import- and config-heavy) cold start.
+        """
+        # Reserve the slot before yielding to the event loop
+        self._created += 1
+        try:
+            agent = await asyncio.to_thread(Manus)
+        except Exception:
+            self._created -= 1
+            raise
+        self._agents.append(agent)
+        return agent
+
+    async def warmup(self, n: Optional[int] = None) -> None:
+        """Pre-create up to `n` agents (default: pool size) concurrently.
+
+        Agents that fail to build give their slot back, so they are created on
+        demand later; the ones that succeeded are still added to the pool.
+        """
+        count = self.max_workers if n is None else n
+        count = min(count, self.max_workers - self._created)
+        if count <= 0:
+            return
+        results = await asyncio.gather(
+            *(self._create_agent() for _ in range(count)), return_exceptions=True
+        )
+        warmed = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error warming up Manus agent: {result}")
+            else:
+                self._idle.put_nowait(result)
+                warmed += 1
+        logger.info(f"Warmed up {warmed} of {count} Manus agents")
+
+    @asynccontextmanager
+    async def acquire(self, max_steps: Optional[int] = None) -> AsyncIterator[Manus]:
+        """Check out an agent, creating one if the pool is not yet full."""
+        if self._warmup_task is None:
+            # Build the other agents while this one is created; the slot for
+            # this request is reserved below before the warmup task first runs
+            self._warmup_task = asyncio.create_task(self.warmup(self.max_workers - 1))
+        if self._idle.empty() and self._created < self.max_workers:
+            agent = await self._create_agent()
+        else:
+            agent = await self._idle.get()
+
+        # Snapshot the settings a request may change. The prompts in particular
+        # must be identical across requests: the system prompt heads every LLM
+        # call, and keeping it static lets provider-side prompt caching reuse
+        # the prefix.
+        defaults = {
+            "max_steps": agent.max_steps,
+            "system_prompt": agent.system_prompt,
+            "next_step_prompt": agent.next_step_prompt,
+        }
+        if max_steps is not None:
+            agent.max_steps = max_steps
+        try:
+            yield agent
+        finally:
+            await self.reset(agent)
+            for field, value in defaults.items():
+                setattr(agent, field, value)
+            self._idle.put_nowait(agent)
+
+    @staticmethod
+    async def reset(agent: Manus) -> None:
+        """Clear per-request state so the agent can serve the next request.
+
+        Besides the agent's own memory and step state this drops state kept by
+        its tools: the browser session (pages, cookies) is closed and the
+        editor's undo history is cleared, so nothing leaks to the next caller.
+        """
+        agent.memory.clear()
+        agent.tool_calls = []
+        agent._current_base64_image = None
+        agent.current_step = 0
+        agent.state = AgentState.IDLE
+
+        for tool in agent.available_tools.tools:
+            file_history = getattr(tool, "_file_history", None)
+            if file_history is not None:
+                file_history.clear()
+        if agent.browser_context_helper:
+            try:
+                await agent.browser_context_helper.cleanup_browser()
+            except Exception as e:
+                logger.error(f"Error closing browser of pooled Manus agent: {e}")
+
+    async def close(self) -> None:
+        """Clean up all agents created by the pool."""
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+            self._warmup_task = None
+        for agent in self._agents:
+            try:
+                await agent.cleanup()
+            except Exception as e:
+                logger.error(f"Error cleaning up pooled Manus agent: {e}")
+        self._agents.clear()
+        self._created = 0
+        self._idle = asyncio.Queue(maxsize=self.max_workers)
+
+
+# Marker identifying an agent thought; it also matches the "✨ Manus's thoughts:"
+# prefix, so a single substring scan covers both forms
+THOUGHT_MARKER = "Manus's thoughts:"
+THOUGHT_SEPARATOR = "\n\n---\n\n"
+
+# Read-only calls of Manus's own tools that may be recorded into a cached plan
+# and replayed, as tool name -> (argument naming the operation, allowed
+# operations). Tools from MCP servers are never replayed.
+PLAN_REPLAYABLE_TOOLS: dict[str, tuple[str, frozenset[str]]] = {
+    "browser_use": (
+        "action",
+        frozenset(
+            {
+                "go_to_url",
+                "web_search",
+                "extract_content",
+                "scroll_down",
+                "scroll_up",
+                "scroll_to_text",
+                "get_dropdown_options",
+                "switch_tab",
+                "open_tab",
+                "go_back",
+            }
+        ),
+    ),
+    "str_replace_editor": ("command", frozenset({"view"})),
+}
+
+# Number of streamed events buffered ahead of a slow client
+STREAM_BUFFER_SIZE = 8
+
+agent_pool = AgentPool(max_workers=int(os.environ.get("MANUS_AGENT_POOL_SIZE", "4")))
+
+
+class ResultCache:
+    """Bounded LRU cache of agent results with a per-entry TTL.
+
+    Prompts are normalized (case and whitespace) before hashing, so trivially
+    different phrasings of the same request share an entry.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    @staticmethod
+    def make_key(prompt: str, max_steps: Optional[int] = None) -> str:
+        """Build a cache key from the normalized prompt and step budget."""
+        normalized = " ".join(prompt.lower().split())
+        return hashlib.sha256(f"{max_steps}:{normalized}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached result for `key`, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store a result, evicting the least recently used entry if full."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._entries.clear()
+
+
+class PlanCache:
+    """LRU cache of tool-call plans keyed on a prompt skeleton.
+
+    Prompts that differ only in their variable parts (URLs, quoted strings,
+    numbers) share a skeleton and usually the same sequence of tool calls. A
+    cached plan is replayed with the new prompt's variables substituted into the
+    tool arguments, so the agent can skip the LLM calls that would plan it. Only
+    read-only calls (see PLAN_REPLAYABLE_TOOLS) are ever recorded.
+    """
+
+    _VARIABLE_PATTERN = re.compile(r"https?://\S+|\"[^\"]+\"|'[^']+'|\d+(?:\.\d+)?")
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[
+            str, tuple[List[str], List[List[ToolCall]]]
+        ] = OrderedDict()
+
+    @classmethod
+    def skeleton(cls, prompt: str) -> tuple[str, List[str]]:
+        """Split a prompt into its normalized skeleton and its variables."""
+        variables = [
+            match.strip("\"'") for match in cls._VARIABLE_PATTERN.findall(prompt)
+        ]
+        skeleton = " ".join(cls._VARIABLE_PATTERN.sub("<var>", prompt).lower().split())
+        return skeleton, variables
+
+    def get(self, prompt: str) -> Optional[List[List[ToolCall]]]:
+        """Return the cached plan for the prompt's skeleton, adapted to its variables."""
+        skeleton, variables = self.skeleton(prompt)
+        entry = self._entries.get(skeleton)
+        if entry is None:
+            return None
+        cached_variables, plan = entry
+        if len(cached_variables) != len(variables):
+            return None
+
+        substitutions = [
+            (old, new) for old, new in zip(cached_variables, variables) if old != new
+        ]
+        adapted = [
+            [self._substitute(call, substitutions) for call in tool_calls]
+            for tool_calls in plan
+        ]
+        # A call that mentions an old variable inside free text (a search query,
+        # an extraction goal) would carry the old subject into this run
+        if any(call is None for tool_calls in adapted for call in tool_calls):
+            return None
+        self._entries.move_to_end(skeleton)
+        return adapted
+
+    def put(self, prompt: str, plan: List[List[ToolCall]]) -> None:
+        """Store the tool calls made for a prompt, one list per agent step."""
+        skeleton, variables = self.skeleton(prompt)
+        self._entries[skeleton] = (variables, plan)
+        self._entries.move_to_end(skeleton)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def is_replayable(call: ToolCall) -> bool:
+        """Check whether a tool call is free of side effects and may be replayed."""
+        if call.function.name not in PLAN_REPLAYABLE_TOOLS:
+            return False
+        key, allowed = PLAN_REPLAYABLE_TOOLS[call.function.name]
+        try:
+            arguments = json.loads(call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return False
+        return isinstance(arguments, dict) and arguments.get(key) in allowed
+
+    @staticmethod
+    def _substitute(
+        call: ToolCall, substitutions: List[tuple[str, str]]
+    ) -> Optional[ToolCall]:
+        """Copy a tool call with prompt variables replaced in its arguments.
+
+        Only string values that exactly match a variable of the cached prompt are
+        replaced; numbers are kept as planned, since they may match a prompt value
+        only by coincidence. Returns None if a longer string mentions a replaced
+        variable, as such text cannot be adapted safely.
+        """
+        if not substitutions:
+            return call
+        try:
+            arguments = json.loads(call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return None
+        replacements = dict(substitutions)
+        mentions = [
+            re.compile(rf"(?<!\w){re.escape(old)}(?!\w)", re.IGNORECASE)
+            for old in replacements
+        ]
+        stale = False
+
+        def replace(value: Any) -> Any:
+            nonlocal stale
+            if isinstance(value, dict):
+                return {key: replace(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [replace(item) for item in value]
+            if isinstance(value, str):
+                if value in replacements:
+                    return replacements[value]
+                if any(mention.search(value) for mention in mentions):
+                    stale = True
+            return value
+
+        arguments = replace(arguments)
+        if stale:
+            return None
+        function = call.function.model_copy(update={"arguments": json.dumps(arguments)})
+        return call.model_copy(update={"function": function})
+
+
 class ManusAgentTool(BaseTool):
     """Tool that exposes the Manus agent as a single MCP tool.
 
@@ -34,252 +399,377 @@ class ManusAgentTool(BaseTool):
                 "description": "Maximum number of steps the agent can take (default: use agent's default)",
                 "default": 80,
             },
+            "cacheable": {
+                "type": "boolean",
+                "description": "Whether the result may be served from or stored in the result cache. Disable for prompts that must run every time (e.g. ones that change state).",
+                "default": True,
+            },
+            "reuse_plan": {
+                "type": "boolean",
+                "description": "Replay the read-only tool calls (searches, page visits, file views) recorded for an earlier prompt of the same shape, with this prompt's values substituted, instead of planning them again. Only enable for prompts whose steps do not depend on changing state. Applies to streaming runs only.",
+                "default": False,
+            },
+            "prompts": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Process several prompts in one call instead of `prompt`; returns a JSON array with one result per prompt",
+            },
+            "batch_size": {
+                "type": "integer",
+                "description": "Maximum number of prompts from `prompts` processed concurrently (default and upper bound: the agent pool size)",
+            },
+            "rate_limit": {
+                "type": "number",
+                "description": "Maximum number of prompts from `prompts` started per second (default: unlimited)",
+            },
         },
-        "required": ["prompt"],
+        "required": [],
     }
 
+    _result_cache: ResultCache = PrivateAttr(default_factory=ResultCache)
+    _plan_cache: PlanCache = PrivateAttr(default_factory=PlanCache)
+
     async def execute(
-        self, prompt: str, max_steps: Optional[int] = None, **kwargs
+        self,
+        prompt: Optional[str] = None,
+        max_steps: Optional[int] = None,
+        cacheable: Optional[bool] = True,
+        reuse_plan: Optional[bool] = False,
+        prompts: Optional[List[str]] = None,
+        batch_size: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        streaming: Optional[bool] = None,
+        **kwargs,
     ) -> Union[ToolResult, AsyncGenerator[str, None]]:
         """Execute the Manus agent with the given prompt.
 
         Args:
             prompt: The user prompt to process
             max_steps: Maximum number of agent steps (None uses agent default)
+            cacheable: Whether the non-streaming result may be cached
+            reuse_plan: Whether a streaming run may replay, and record, the
+                read-only tool calls cached for prompts of the same shape
+            prompts: Several prompts to process as a batch instead of `prompt`
+            batch_size: Maximum number of batch prompts processed concurrently
+            rate_limit: Maximum number of batch prompts started per second
+            streaming: Whether to return an event stream; None follows the
+                server's MCP_SERVER_STREAMING setting
 
         Returns:
             Either a ToolResult with the final result, or an AsyncGenerator for streaming
         """
-        try:
-            # Create Manus agent instance - do this first to ensure imports work
-            logger.info(f"Creating Manus agent instance for prompt: {prompt}")
-            agent = Manus()
-            if max_steps is not None:
-                agent.max_steps = max_steps
-
-            # Check if streaming should be used based on server setting only
-            server_streaming = (
+        if prompts:
+            results = await self.execute_batch(
+                prompts,
+                max_concurrency=batch_size,
+                rate_limit=rate_limit,
+                max_steps=max_steps,
+                cacheable=cacheable,
+            )
+            return ToolResult(
+                output=_dumps([result.model_dump() for result in results])
+            )
+
+        if not prompt:
+            return ToolResult(error="Either 'prompt' or 'prompts' must be provided")
+
+        # Stream whenever the caller can consume incremental events, so the first
+        # step reaches the client without waiting for the whole run. Callers that
+        # do not say fall back to the server-wide setting.
+        if streaming is None:
+            streaming = (
                 os.environ.get("MCP_SERVER_STREAMING", "false").lower() == "true"
             )
-            logger.info(f"Server streaming setting: {server_streaming}")
+        logger.debug("Streaming enabled: {}", streaming)
 
-            # If server has streaming enabled, use the streaming generator
-            if server_streaming:
-                logger.info(f"Using streaming mode for prompt: {prompt}")
-                # This function returns an async generator that will yield string results
-                return self._run_with_streaming(prompt, max_steps, agent)
+        # If streaming is enabled, use the streaming generator
+        if streaming:
+            logger.debug("Using streaming mode for prompt: {}", prompt)
+            # This function returns an async generator that will yield string results
+            return self._run_with_streaming(prompt, max_steps, reuse_plan)
 
-            # Otherwise, run non-streaming version where we directly run the agent
-            # and capture the final thought
-            logger.info(f"Running Manus agent with prompt: {prompt}")
+        return await self._execute_once(prompt, max_steps, cacheable)
 
-            # Initialize the agent
-            agent.messages = [Message.user_message(prompt)]
-            agent.current_step = 0
-            agent.state = AgentState.RUNNING
+    async def execute_batch(
+        self,
+        prompts: List[str],
+        max_concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        max_steps: Optional[int] = None,
+        cacheable: Optional[bool] = True,
+    ) -> List[ToolResult]:
+        """Run several prompts concurrently, returning one result per prompt.
 
-            # Track the last two thoughts
-            thoughts = []
+        Args:
+            prompts: The user prompts to process
+            max_concurrency: Maximum number of prompts processed at once; capped
+                at (and defaulting to) the agent pool size, since each prompt
+                needs its own agent
+            rate_limit: Maximum number of prompts started per second
+            max_steps: Maximum number of agent steps per prompt
+            cacheable: Whether results may be served from or stored in the cache
 
-            # Run steps until completion or max steps reached
-            while (
-                agent.state == AgentState.RUNNING
-                and agent.current_step < agent.max_steps
-            ):
-                agent.current_step += 1
+        Returns:
+            A list of ToolResults in the same order as `prompts`
+        """
+        max_concurrency = min(
+            max_concurrency or agent_pool.max_workers, agent_pool.max_workers
+        )
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _run_one(index: int, prompt: str) -> ToolResult:
+            # Stagger start times so no more than `rate_limit` prompts start per second
+            if rate_limit:
+                await asyncio.sleep(index / rate_limit)
+            async with semaphore:
+                return await self._execute_once(prompt, max_steps, cacheable)
+
+        logger.info(
+            f"Running batch of {len(prompts)} prompts with concurrency {max_concurrency}"
+        )
+        return await asyncio.gather(
+            *(_run_one(i, prompt) for i, prompt in enumerate(prompts))
+        )
+
+    async def _execute_once(
+        self,
+        prompt: str,
+        max_steps: Optional[int] = None,
+        cacheable: Optional[bool] = True,
+    ) -> ToolResult:
+        """Run a single prompt to completion, using the result cache if allowed.
 
-                try:
-                    # Execute thinking step
-                    should_act = await agent.think()
-
-                    # Capture the most recent thought
-                    last_messages = [
-                        msg
-                        for msg in agent.memory.messages
-                        if hasattr(msg, "role")
-                        and msg.role == "assistant"
-                        and hasattr(msg, "content")
-                        and msg.content.strip()
-                    ]
+        Cached plans are never replayed here; replay is limited to streaming
+        runs, where each replayed step is reported to the caller as it happens.
+        """
+        # Serve repeated prompts from the result cache
+        cacheable = cacheable is not False
+        cache_key = ResultCache.make_key(prompt, max_steps)
+        if cacheable:
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Returning cached result for prompt: {prompt}")
+                return ToolResult(output=cached)
 
-                    # Store thought if it exists
-                    if last_messages:
-                        current_thought = last_messages[-1].content
-                        if current_thought not in thoughts:  # avoid duplicates
-                            thoughts.append(current_thought)
-
-                    # If should act, perform the action
-                    if should_act:
-                        await agent.act()
-
-                except Exception as e:
-                    logger.error(f"Error in agent step {agent.current_step}: {str(e)}")
-                    agent.state = AgentState.FINISHED
-
-                # Break if agent is finished
-                if agent.state == AgentState.FINISHED:
-                    break
-
-            # Process the collected thoughts
-            processed_thoughts = []
-
-            # Get the last two thoughts (or fewer if not enough)
-            last_n_thoughts = thoughts[-2:] if len(thoughts) >= 2 else thoughts
-
-            # Add thought marker to each thought if not already present
-            for i, thought in enumerate(last_n_thoughts):
-                if not any(
-                    marker in thought
-                    for marker in ["✨ Manus's thoughts:", "Manus's thoughts:"]
-                ):
-                    processed_thoughts.append(f"✨ Manus's thoughts {i+1}: {thought}")
-                else:
-                    processed_thoughts.append(thought)
-
-            # Join thoughts with a separator
-            final_output = "\n\n---\n\n".join(processed_thoughts)
-
-            # Return the thoughts in a clean structure
-            logger.info(
-                f"Completed processing in {agent.current_step} steps, captured {len(processed_thoughts)} thoughts"
-            )
-            return ToolResult(
-                output=json.dumps({"status": "complete", "thoughts": final_output})
-            )
+        try:
+            # Check out a pooled Manus agent; it is reset when returned
+            logger.debug("Acquiring Manus agent for prompt: {}", prompt)
+            async with agent_pool.acquire(max_steps) as agent:
+                output, step_failed = await self._run(prompt, agent)
+
+            # Never cache a run cut short by an error, e.g. a transient LLM failure
+            if cacheable and not step_failed:
+                self._result_cache.put(cache_key, output)
+            return ToolResult(output=output)
 
         except Exception as e:
             logger.error(f"Error running Manus agent: {str(e)}")
             return ToolResult(error=f"Error running Manus agent: {str(e)}")
 
+    @staticmethod
+    def _latest_thought(agent: Manus) -> Optional[str]:
+        """Return the content of the most recent non-blank assistant message.
+
+        Scans memory from the end and stops at the first match, without
+        building a filtered list or stripped copies of every message.
+        """
+        for msg in reversed(agent.memory.messages):
+            # Memory only holds Message instances, so fields are read directly
+            if msg.role == Role.ASSISTANT and msg.content and not msg.content.isspace():
+                return msg.content
+        return None
+
     async def _run_with_streaming(
         self,
         prompt: str,
         max_steps: Optional[int] = None,
-        agent: Optional[Manus] = None,
+        reuse_plan: Optional[bool] = False,
     ) -> AsyncGenerator[str, None]:
         """Run the agent with streaming output.
 
         Yields JSON strings with progress updates and directly captures the final thought.
-        The implementation mirrors the non-streaming version but yields progress updates.
+        The agent steps run in a separate producer task that feeds a bounded queue,
+        so the next step starts while the client is still receiving earlier events.
         """
         try:
-            # Create agent if not provided
-            if agent is None:
-                logger.info(f"Creating new Manus agent for streaming")
-                agent = Manus()
-                if max_steps is not None:
-                    agent.max_steps = max_steps
-
-            # Initialize the agent
-            logger.info(f"Initializing agent for streaming with prompt: {prompt}")
-            agent.messages = [Message.user_message(prompt)]
-            agent.current_step = 0
-            agent.state = AgentState.RUNNING
-
-            # Yield initial status
-            initial_status = json.dumps(
-                {
-                    "status": "started",
-                    "step": 0,
-                    "message": f"Processing: '{prompt[:50]}{'...' if len(prompt) > 50 else ''}",
-                }
-            )
-            logger.info(
-                f"Started processing with prompt: {prompt[:50]}{'...' if len(prompt) > 50 else ''}"
-            )
-            yield initial_status
-
-            # Track thoughts for final output
-            thoughts = []
-
-            # Run steps until completion or max steps reached
-            while (
-                agent.state == AgentState.RUNNING
-                and agent.current_step < agent.max_steps
-            ):
-                agent.current_step += 1
-
-                # Execute a single step
+            # Check out a pooled Manus agent for the lifetime of the stream
+            async with agent_pool.acquire(max_steps) as agent:
+                queue: asyncio.Queue[Optional[str]] = asyncio.Queue(
+                    maxsize=STREAM_BUFFER_SIZE
+                )
+                producer = asyncio.create_task(
+                    self._produce_events(prompt, agent, queue, reuse_plan is True)
+                )
                 try:
-                    should_act = await agent.think()
-
-                    # Get messages that contain thinking
-                    last_messages = [
-                        msg
-                        for msg in agent.memory.messages
-                        if hasattr(msg, "role")
-                        and msg.role == "assistant"
-                        and hasattr(msg, "content")
-                        and msg.content.strip()
-                    ]
-
-                    # Store thought if it exists and is not a duplicate
-                    if last_messages:
-                        current_thought = last_messages[-1].content
-                        if current_thought not in thoughts:  # avoid duplicates
-                            thoughts.append(current_thought)
-
-                    # Yield a progress update
-                    yield json.dumps({"status": "thinking", "step": agent.current_step})
-
-                    # If should act, perform the action
-                    if should_act:
-                        await agent.act()
-
-                        # Yield an action progress update
-                        yield json.dumps(
-                            {"status": "acting", "step": agent.current_step}
-                        )
-
-                except Exception as e:
-                    # Yield any errors that occur during processing
-                    error_msg = str(e)
-                    yield json.dumps(
-                        {
-                            "status": "error",
-                            "step": agent.current_step,
-                            "error": error_msg,
-                        }
-                    )
-                    agent.state = AgentState.FINISHED
-
-                # Small delay to avoid overwhelming the client
-                await asyncio.sleep(0.05)
-
-                # Break if agent is finished
-                if agent.state == AgentState.FINISHED:
-                    break
-
-            # Process the collected thoughts
-            processed_thoughts = []
-
-            # Get the last two thoughts (or fewer if not enough)
-            last_n_thoughts = thoughts[-2:] if len(thoughts) >= 2 else thoughts
-
-            # Add thought marker to each thought if not already present
-            for i, thought in enumerate(last_n_thoughts):
-                if not any(
-                    marker in thought
-                    for marker in ["✨ Manus's thoughts:", "Manus's thoughts:"]
-                ):
-                    processed_thoughts.append(f"✨ Manus's thoughts {i+1}: {thought}")
-                else:
-                    processed_thoughts.append(thought)
-
-            # Join thoughts with a separator
-            final_output = "\n\n---\n\n".join(processed_thoughts)
-
-            # Log completion
-            logger.info(
-                f"Completed processing in {agent.current_step} steps, captured {len(processed_thoughts)} thoughts"
-            )
-
-            # Yield the combined thoughts in the result
-            final_result = json.dumps({"status": "complete", "thoughts": final_output})
-            yield final_result
+                    while (event := await queue.get()) is not None:
+                        yield event
+                finally:
+                    # Stop the producer if the consumer went away early
+                    if not producer.done():
+                        producer.cancel()
+                    await asyncio.gather(producer, return_exceptions=True)
 
         except Exception as e:
             # Yield any exceptions that occur
-            error_msg = json.dumps({"status": "error", "error": str(e)})
+            error_msg = _dumps({"status": "error", "error": str(e)})
             logger.error(f"Streaming error: {str(e)}")
             yield error_msg
+
+    async def _produce_events(
+        self,
+        prompt: str,
+        agent: Manus,
+        queue: asyncio.Queue,
+        reuse_plan: bool = False,
+    ) -> None:
+        """Run the agent, pushing JSON progress events onto `queue`.
+
+        The final result follows the progress events, then a None sentinel.
+        """
+        try:
+            output, _ = await self._run(prompt, agent, queue.put, reuse_plan)
+            await queue.put(output)
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}")
+            await queue.put(_dumps({"status": "error", "error": str(e)}))
+
+        await queue.put(None)
+
+    async def _run(
+        self,
+        prompt: str,
+        agent: Manus,
+        emit: Callable[[str], Awaitable[None]] = _discard_event,
+        reuse_plan: bool = False,
+    ) -> tuple[str, bool]:
+        """Run the agent to completion, reporting progress events through `emit`.
+
+        Shared by the streaming and non-streaming paths. When `reuse_plan` is set,
+        a plan cached for a similar prompt is replayed before the regular loop,
+        and the read-only tool calls of a successful run are cached as its plan.
+
+        Returns:
+            The final "complete" event carrying the last two thoughts, and whether
+            any step failed
+        """
+        # Initialize the agent; the prompt only ever goes in as a user message so
+        # the system prompt stays a static, cacheable prefix
+        agent.messages = [Message.user_message(prompt)]
+        agent.current_step = 0
+        agent.state = AgentState.RUNNING
+
+        # Report initial status
+        preview = prompt[:50] + "..." if len(prompt) > 50 else prompt
+        logger.info(f"Started processing with prompt: {preview}")
+        await emit(
+            _dumps(
+                {"status": "started", "step": 0, "message": f"Processing: '{preview}"}
+            )
+        )
+
+        # Track the last two distinct thoughts; earlier ones are never reported
+        thoughts: deque[str] = deque(maxlen=2)
+        seen_thoughts: set[str] = set()
+
+        # Replay a cached plan, leaving the agent to synthesize the result
+        cached_plan = self._plan_cache.get(prompt) if reuse_plan else None
+        if cached_plan:
+            try:
+                await self._replay_plan(agent, cached_plan, emit)
+            except Exception as e:
+                logger.warning(f"Failed to replay cached plan: {str(e)}")
+
+        # Record the tool calls of this run so similar prompts can replay them;
+        # recording stops at the first call with side effects, as later calls may
+        # depend on it
+        plan: List[List[ToolCall]] = []
+        recording = reuse_plan and not cached_plan
+        step_failed = False
+
+        # Run steps until completion or max steps reached
+        while (
+            agent.state == AgentState.RUNNING and agent.current_step < agent.max_steps
+        ):
+            agent.current_step += 1
+
+            try:
+                # Execute thinking step
+                should_act = await agent.think()
+
+                # Store thought if it exists and is not a duplicate
+                current_thought = self._latest_thought(agent)
+                if current_thought and current_thought not in seen_thoughts:
+                    seen_thoughts.add(current_thought)  # avoid duplicates
+                    thoughts.append(current_thought)
+
+                if recording:
+                    planned_calls = [
+                        call
+                        for call in agent.tool_calls
+                        if call.function.name not in agent.special_tool_names
+                    ]
+                    recording = all(map(PlanCache.is_replayable, planned_calls))
+                    if recording and planned_calls:
+                        plan.append(planned_calls)
+
+                # Report a progress update
+                await emit(_step_event("thinking", agent.current_step))
+
+                # If should act, perform the action
+                if should_act:
+                    await agent.act()
+
+                    # Report an action progress update
+                    await emit(_step_event("acting", agent.current_step))
+
+            except Exception as e:
+                # Report any errors that occur during processing
+                logger.error(f"Error in agent step {agent.current_step}: {str(e)}")
+                await emit(_step_error_event(agent.current_step, str(e)))
+                step_failed = True
+                agent.state = AgentState.FINISHED
+
+            # Break if agent is finished
+            if agent.state == AgentState.FINISHED:
+                break
+
+        if reuse_plan and not cached_plan and not step_failed and plan:
+            self._plan_cache.put(prompt, plan)
+
+        # Process the collected thoughts
+        processed_thoughts = []
+
+        # Add thought marker to each thought if not already present
+        for i, thought in enumerate(thoughts):
+            if THOUGHT_MARKER not in thought:
+                processed_thoughts.append(f"✨ Manus's thoughts {i+1}: {thought}")
+            else:
+                processed_thoughts.append(thought)
+
+        # Join thoughts with a separator
+        final_output = THOUGHT_SEPARATOR.join(processed_thoughts)
+
+        logger.info(
+            f"Completed processing in {agent.current_step} steps, captured {len(processed_thoughts)} thoughts"
+        )
+        return _dumps({"status": "complete", "thoughts": final_output}), step_failed
+
+    @staticmethod
+    async def _replay_plan(
+        agent: Manus,
+        plan: List[List[ToolCall]],
+        emit: Callable[[str], Awaitable[None]],
+    ) -> None:
+        """Execute a cached plan's tool calls without asking the LLM for them.
+
+        One step of the budget is always left for the agent to think about the
+        results.
+        """
+        for tool_calls in plan:
+            if agent.current_step >= agent.max_steps - 1:
+                break
+            agent.current_step += 1
+            agent.tool_calls = tool_calls
+            agent.memory.add_message(Message.from_tool_calls(tool_calls=tool_calls))
+            await agent.act()
+            await emit(_step_event("plan_cache_hit", agent.current_step))
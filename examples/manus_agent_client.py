@@ -29,12 +29,18 @@ async def run_manus_agent_simple(prompt: str) -> None:
         # Call the high-level Manus agent
         result = await client.call("manus_agent", prompt=prompt, streaming=False)
 
-        # Parse and display the result
-        try:
-            result_json = json.loads(result)
+        # Parse and display the result, only attempting a parse if it looks like JSON
+        result_json = None
+        if result.lstrip()[:1] in ("{", "["):
+            try:
+                result_json = json.loads(result)
+            except json.JSONDecodeError:
+                pass
+
+        if result_json is not None:
             print("\nResult:")
             print(json.dumps(result_json, indent=2))
-        except:
+        else:
             # If not JSON, display as string
             print(f"\nResult: {result}")
 
@@ -113,6 +119,12 @@ async def run_manus_agent_streaming(
         counter = 0
         async for event in generator:
             counter += 1
+
+            # Events are JSON objects; print anything else raw without parsing it
+            if not event.lstrip().startswith("{"):
+                print(f"Raw event {counter}: {event}")
+                continue
+
             try:
                 # Parse and display each event
                 event_data = json.loads(event)
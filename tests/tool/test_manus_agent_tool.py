@@ -0,0 +1,443 @@
+import asyncio
+import json
+from typing import AsyncGenerator, List
+
+import pytest
+import pytest_asyncio
+
+from app.schema import AgentState, Function, Memory, Message, ToolCall
+from app.tool import manus_agent_tool
+from app.tool.manus_agent_tool import (
+    AgentPool,
+    ManusAgentTool,
+    PlanCache,
+    ResultCache,
+)
+
+
+class FakeTools:
+    def __init__(self):
+        self.tools: List = []
+
+
+class FakeAgent:
+    """Minimal stand-in for Manus that finishes after one thought."""
+
+    created = 0
+
+    def __init__(self):
+        FakeAgent.created += 1
+        self.memory = Memory()
+        self.max_steps = 20
+        self.current_step = 0
+        self.state = AgentState.IDLE
+        self.system_prompt = "system"
+        self.next_step_prompt = "next"
+        self.tool_calls = []
+        self.special_tool_names = ["terminate"]
+        self.available_tools = FakeTools()
+        self.browser_context_helper = None
+        self._current_base64_image = None
+        self.fail = False
+        self.cleaned_up = False
+
+    @property
+    def messages(self):
+        return self.memory.messages
+
+    @messages.setter
+    def messages(self, value):
+        self.memory.messages = value
+
+    async def think(self) -> bool:
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("LLM 429 rate limited")
+        prompt = self.memory.messages[0].content
+        self.memory.add_message(Message.assistant_message(f"answer to {prompt}"))
+        self.state = AgentState.FINISHED
+        return False
+
+    async def act(self) -> str:
+        return ""
+
+    async def cleanup(self):
+        self.cleaned_up = True
+
+
+@pytest_asyncio.fixture(scope="function")
+async def pool(monkeypatch) -> AsyncGenerator[AgentPool, None]:
+    """Replaces the module's agent pool with a small pool of fake agents."""
+    FakeAgent.created = 0
+    monkeypatch.setattr(manus_agent_tool, "Manus", FakeAgent)
+    pool = AgentPool(max_workers=2)
+    monkeypatch.setattr(manus_agent_tool, "agent_pool", pool)
+    try:
+        yield pool
+    finally:
+        # Cancel any background warmup and clean up the agents
+        await pool.close()
+
+
+def test_result_cache_normalizes_prompts():
+    cache = ResultCache()
+    cache.put(ResultCache.make_key("  Hello   World "), "result")
+
+    assert cache.get(ResultCache.make_key("hello world")) == "result"
+    assert cache.get(ResultCache.make_key("hello world", max_steps=5)) is None
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+
+def test_result_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(manus_agent_tool.time, "monotonic", lambda: now[0])
+    cache = ResultCache(ttl=10)
+    cache.put("a", "1")
+
+    now[0] += 5
+    assert cache.get("a") == "1"
+    now[0] += 6
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_and_resets_agents(pool):
+    # A single agent, so the second checkout must reuse it
+    single = AgentPool(max_workers=1)
+    async with single.acquire(max_steps=5) as agent:
+        assert agent.max_steps == 5
+        agent.memory.add_message(Message.user_message("hi"))
+        agent.current_step = 3
+        agent.next_step_prompt = "changed"
+
+    async with single.acquire() as reused:
+        assert reused is agent
+        assert reused.max_steps == 20
+        assert reused.next_step_prompt == "next"
+        assert reused.memory.messages == []
+        assert reused.current_step == 0
+        assert reused.state == AgentState.IDLE
+
+    assert FakeAgent.created == 1
+    await single.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_never_exceeds_max_workers(pool):
+    active = 0
+    peak = 0
+
+    async def use_agent():
+        nonlocal active, peak
+        async with pool.acquire():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(use_agent() for _ in range(6)))
+
+    assert peak == 2
+    assert FakeAgent.created == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_close_cleans_up_agents(pool):
+    async with pool.acquire() as agent:
+        pass
+    await pool.close()
+
+    assert agent.cleaned_up
+
+
+@pytest.mark.asyncio
+async def test_pool_warms_up_on_first_use(pool):
+    async with pool.acquire():
+        await pool._warmup_task
+
+    assert FakeAgent.created == 2
+    assert pool._idle.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_warmup_keeps_agents_that_were_built(monkeypatch):
+    class FlakyAgent(FakeAgent):
+        def __init__(self):
+            super().__init__()
+            if FakeAgent.created == 2:
+                raise RuntimeError("browser failed to start")
+
+    FakeAgent.created = 0
+    monkeypatch.setattr(manus_agent_tool, "Manus", FlakyAgent)
+    pool = AgentPool(max_workers=3)
+
+    await pool.warmup()
+
+    assert pool._idle.qsize() == 2
+    assert pool._created == 2
+    # The failed slot is rebuilt on demand
+    async with pool.acquire():
+        async with pool.acquire():
+            async with pool.acquire():
+                pass
+    assert pool._created == 3
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_execute_batch_returns_results_in_order(pool):
+    tool = ManusAgentTool()
+
+    results = await tool.execute_batch(["one", "two", "three"], max_concurrency=10)
+
+    thoughts = [json.loads(result.output)["thoughts"] for result in results]
+    for thought, prompt in zip(thoughts, ["one", "two", "three"]):
+        assert thought.endswith(f"answer to {prompt}")
+    # Concurrency is capped at the pool size
+    assert FakeAgent.created == 2
+
+
+@pytest.mark.asyncio
+async def test_execute_with_prompts_returns_json_array(pool):
+    tool = ManusAgentTool()
+
+    result = await tool.execute(prompts=["one", "two"], streaming=False)
+
+    assert len(json.loads(result.output)) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_runs_are_not_cached(pool):
+    tool = ManusAgentTool()
+    async with pool.acquire() as agent:
+        agent.fail = True
+
+    await tool.execute(prompt="flaky", streaming=False)
+    agent.fail = False
+    result = await tool.execute(prompt="flaky", streaming=False)
+
+    assert json.loads(result.output)["thoughts"].endswith("answer to flaky")
+
+
+class EndlessAgent(FakeAgent):
+    """Fake agent that keeps acting until it is stopped."""
+
+    def __init__(self):
+        super().__init__()
+        self.steps = 0
+
+    async def think(self) -> bool:
+        self.steps += 1
+        await asyncio.sleep(0)
+        return True
+
+
+@pytest.mark.asyncio
+async def test_streaming_events_arrive_in_order(pool):
+    tool = ManusAgentTool()
+
+    stream = await tool.execute(prompt="hi", streaming=True)
+    events = [json.loads(event) async for event in stream]
+
+    assert [event["status"] for event in events] == [
+        "started",
+        "thinking",
+        "complete",
+    ]
+    assert events[1]["step"] == 1
+    assert events[-1]["thoughts"].endswith("answer to hi")
+
+
+@pytest.mark.asyncio
+async def test_closing_a_stream_early_stops_the_run(pool, monkeypatch):
+    monkeypatch.setattr(manus_agent_tool, "Manus", EndlessAgent)
+    tool = ManusAgentTool()
+
+    stream = await tool.execute(prompt="hi", max_steps=1000, streaming=True)
+    assert json.loads(await stream.__anext__())["status"] == "started"
+    await asyncio.wait_for(stream.aclose(), timeout=1)
+
+    await pool._warmup_task
+    agents = pool._agents
+    steps = [agent.steps for agent in agents]
+    await asyncio.sleep(0.01)
+    # The producer was cancelled and the agent is back in the pool, reset
+    assert [agent.steps for agent in agents] == steps
+    assert pool._idle.qsize() == len(agents) == 2
+    assert all(agent.current_step == 0 for agent in agents)
+
+
+@pytest.mark.asyncio
+async def test_streaming_producer_errors_become_error_events(pool, monkeypatch):
+    async def failing_run(self, prompt, agent, emit, reuse_plan=False):
+        await emit('{"status":"started","step":0}')
+        raise RuntimeError("agent crashed")
+
+    monkeypatch.setattr(ManusAgentTool, "_run", failing_run)
+    tool = ManusAgentTool()
+
+    stream = await tool.execute(prompt="hi", streaming=True)
+    events = [json.loads(event) async for event in stream]
+
+    assert events == [
+        {"status": "started", "step": 0},
+        {"status": "error", "error": "agent crashed"},
+    ]
+    await pool._warmup_task
+    assert pool._idle.qsize() == pool._created == 2
+
+
+def make_call(name: str, **arguments) -> ToolCall:
+    return ToolCall(
+        id="call_1",
+        function=Function(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def test_plan_cache_skeleton_extracts_variables():
+    skeleton, variables = PlanCache.skeleton(
+        'Summarize  "Dune" from https://example.com/a in 3 lines'
+    )
+
+    assert skeleton == "summarize <var> from <var> in <var> lines"
+    assert variables == ["Dune", "https://example.com/a", "3"]
+
+
+def test_plan_cache_get_substitutes_matching_strings_only():
+    cache = PlanCache()
+    cache.put(
+        'Search "dune" and show 3 results',
+        [[make_call("browser_use", action="web_search", query="dune", limit=3)]],
+    )
+
+    plan = cache.get('search "Foundation" and show 7 results')
+
+    arguments = json.loads(plan[0][0].function.arguments)
+    assert arguments == {"action": "web_search", "query": "Foundation", "limit": 3}
+
+
+def test_plan_cache_get_misses_when_free_text_mentions_a_variable():
+    cache = PlanCache()
+    cache.put(
+        "Summarize https://a.com",
+        [
+            [make_call("browser_use", action="go_to_url", url="https://a.com")],
+            [
+                make_call(
+                    "browser_use",
+                    action="extract_content",
+                    goal="summary of https://a.com",
+                )
+            ],
+        ],
+    )
+
+    assert cache.get("Summarize https://b.com") is None
+    # The unchanged prompt still replays the plan as recorded
+    assert len(cache.get("Summarize https://a.com")) == 2
+
+
+def test_plan_cache_get_misses_other_skeletons():
+    cache = PlanCache()
+    cache.put(
+        'Search "dune"', [[make_call("browser_use", action="web_search", query="dune")]]
+    )
+
+    assert cache.get('Open "dune"') is None
+    assert cache.get('Search "dune" and "foundation"') is None
+
+
+def test_plan_cache_substitute_leaves_numbers_alone():
+    call = make_call("browser_use", action="switch_tab", tab_id=3, text="3")
+
+    substituted = PlanCache._substitute(call, [("3", "7")])
+
+    arguments = json.loads(substituted.function.arguments)
+    assert arguments == {"action": "switch_tab", "tab_id": 3, "text": "7"}
+
+
+def test_plan_cache_only_replays_read_only_calls():
+    assert PlanCache.is_replayable(make_call("browser_use", action="web_search"))
+    assert PlanCache.is_replayable(make_call("browser_use", action="go_to_url"))
+    assert PlanCache.is_replayable(make_call("str_replace_editor", command="view"))
+    assert not PlanCache.is_replayable(make_call("browser_use", action="click_element"))
+    assert not PlanCache.is_replayable(
+        make_call("str_replace_editor", command="create")
+    )
+    assert not PlanCache.is_replayable(make_call("python_execute", code="print(1)"))
+    assert not PlanCache.is_replayable(make_call("ask_human", inquire="ok?"))
+    assert not PlanCache.is_replayable(make_call("web_search", query="dune"))
+
+
+class PlanningAgent(FakeAgent):
+    """Fake agent that makes one scripted round of tool calls per step."""
+
+    def __init__(self, script: List[List[ToolCall]]):
+        super().__init__()
+        self.script = script
+
+    async def think(self) -> bool:
+        if self.current_step > len(self.script):
+            self.tool_calls = []
+            return await super().think()
+        self.tool_calls = self.script[self.current_step - 1]
+        return True
+
+
+@pytest.mark.asyncio
+async def test_plan_recording_stops_at_side_effects():
+    tool = ManusAgentTool()
+    script = [
+        [make_call("browser_use", action="web_search", query="dune")],
+        [make_call("python_execute", code="open('x', 'w')")],
+        [make_call("browser_use", action="web_search", query="dune")],
+    ]
+
+    await tool._run('Search "dune"', PlanningAgent(script), reuse_plan=True)
+
+    plan = tool._plan_cache.get('Search "dune"')
+    assert [[call.function.name for call in calls] for calls in plan] == [
+        ["browser_use"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_plans_are_not_recorded_without_opt_in():
+    tool = ManusAgentTool()
+    script = [[make_call("browser_use", action="web_search", query="dune")]]
+
+    await tool._run('Search "dune"', PlanningAgent(script))
+
+    assert tool._plan_cache.get('Search "dune"') is None
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_runs_never_replay_plans(pool, monkeypatch):
+    replayed = []
+
+    async def record_replay(agent, plan, emit):
+        replayed.append(plan)
+
+    monkeypatch.setattr(ManusAgentTool, "_replay_plan", staticmethod(record_replay))
+    tool = ManusAgentTool()
+    tool._plan_cache.put(
+        'Search "dune"', [[make_call("browser_use", action="web_search", query="dune")]]
+    )
+
+    result = await tool.execute(
+        prompt='Search "dune"', reuse_plan=True, streaming=False
+    )
+
+    assert json.loads(result.output)["status"] == "complete"
+    assert replayed == []